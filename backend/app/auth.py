@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 from typing import Any, Optional
 
 import httpx
+from cachetools import TTLCache
 from fastapi import Header, HTTPException, status
 
 from .config import settings
@@ -24,36 +26,77 @@ class StrapiUser:
         )
 
 
+# One pooled client for all Strapi calls so polling requests reuse the
+# keep-alive connection instead of re-handshaking every time. It is opened on
+# startup and closed on shutdown so the pool always belongs to the current loop.
+_client: Optional[httpx.AsyncClient] = None
+_user_cache: TTLCache[str, StrapiUser] = TTLCache(maxsize=1024, ttl=settings.strapi_user_cache_seconds)
+_user_cache_lock = asyncio.Lock()
+
+
+async def start_strapi_client() -> None:
+    global _client, _user_cache_lock
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=settings.strapi_base_url, timeout=settings.strapi_timeout_seconds)
+    _user_cache_lock = asyncio.Lock()
+
+
+async def close_strapi_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _dev_user(entry: dict[str, object]) -> StrapiUser:
+    raw_id = entry.get("id", 0)
+    try:
+        user_id = int(raw_id)
+    except (TypeError, ValueError):
+        user_id = 0
+    dev_payload = {
+        "id": user_id,
+        "username": entry.get("username", entry.get("email", "dev")),
+        "email": entry.get("email"),
+    }
+    return StrapiUser.from_payload(dev_payload)
+
+
+# Dev tokens are fixed for the process lifetime, so resolve them once.
+_dev_users: dict[str, StrapiUser] = {
+    token: _dev_user(entry) for token, entry in settings.strapi_dev_tokens.items() if entry
+}
+
+
 async def fetch_strapi_user(token: str) -> StrapiUser:
-    dev_token = settings.strapi_dev_tokens.get(token)
-    if dev_token:
-        raw_id = dev_token.get("id", 0)
-        try:
-            user_id = int(raw_id)
-        except (TypeError, ValueError):
-            user_id = 0
-        dev_payload = {
-            "id": user_id,
-            "username": dev_token.get("username", dev_token.get("email", "dev")),
-            "email": dev_token.get("email"),
-        }
-        return StrapiUser.from_payload(dev_payload)
+    dev_user = _dev_users.get(token)
+    if dev_user is not None:
+        return dev_user
+
+    async with _user_cache_lock:
+        cached = _user_cache.get(token)
+    if cached is not None:
+        return cached
 
+    if _client is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service not ready")
     headers = {"Authorization": f"Bearer {token}"}
-    async with httpx.AsyncClient(timeout=settings.strapi_timeout_seconds) as client:
-        response = await client.get(f"{settings.strapi_base_url}/api/users/me", headers=headers)
+    response = await _client.get("/api/users/me", headers=headers)
     if response.status_code != status.HTTP_200_OK:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     payload = response.json()
     if not isinstance(payload, dict) or "id" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user payload")
-    return StrapiUser.from_payload(payload)
+    user = StrapiUser.from_payload(payload)
+    async with _user_cache_lock:
+        _user_cache[token] = user
+    return user
 
 
 async def get_current_user(authorization: str = Header(..., alias="Authorization")) -> StrapiUser:
-    if not authorization.lower().startswith("bearer "):
+    if authorization[:7].lower() != "bearer ":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authorization header")
-    token = authorization.split(" ", 1)[1].strip()
+    token = authorization[7:].strip()
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
     return await fetch_strapi_user(token)
@@ -1,5 +1,4 @@
 from pathlib import Path
-from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +10,10 @@ class Settings(BaseSettings):
         env_file=".env",
         case_sensitive=False,
         arbitrary_types_allowed=True,
+        frozen=True,
+        # Older .env files may still set retired keys (POPPLER_PATH,
+        # WORKER_POLL_INTERVAL); ignore them rather than refuse to start.
+        extra="ignore",
     )
 
     base_dir: Path = Path(__file__).resolve().parents[2]
@@ -19,17 +22,18 @@ class Settings(BaseSettings):
     result_dir: Path = data_dir / "results"
 
     libreoffice_path: str = "soffice"
-    poppler_path: Optional[Path] = None
     convert_timeout_seconds: int = 300
-    worker_poll_interval: float = 2.0
     max_worker_threads: int = 2
+    max_pending_tasks: int = 0
     cleanup_hours: int = 24
 
     default_dpi: int = 144
     background_color_threshold: int = 235
+    png_compress_level: int = 1
 
     strapi_base_url: str = "http://localhost:1337"
     strapi_timeout_seconds: int = 5
+    strapi_user_cache_seconds: int = 30
     strapi_dev_tokens: dict[str, dict[str, object]] = {}
 
 
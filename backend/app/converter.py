@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import io
 import json
+import os
 import shutil
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
-from zipfile import ZipFile
+from queue import Queue
+from typing import Deque, Dict, Iterable, Iterator, Optional, Tuple, Union
+from zipfile import ZIP_STORED, ZipFile
 
+import numpy as np
+import pypdfium2 as pdfium
+from numba import njit
 from PIL import Image, ImageColor
-from pdf2image import convert_from_path
 
 from .config import settings
 from .models import BackgroundType, Task
@@ -20,9 +28,48 @@ class ConversionError(Exception):
     pass
 
 
+# PDFium is not thread-safe, not even across separate documents, so every
+# call into it is serialized process-wide.
+_PDFIUM_LOCK = threading.Lock()
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def _composite(out: np.ndarray, background: np.ndarray, threshold: int) -> None:
+    # One fused pass per pixel: luma (PIL's fixed-point RGB -> L weights),
+    # threshold and select. Pages are already spread over a thread pool, so
+    # the kernel releases the GIL instead of running its own parallel loop.
+    height, width, _ = out.shape
+    for y in range(height):
+        for x in range(width):
+            r = out[y, x, 0]
+            g = out[y, x, 1]
+            b = out[y, x, 2]
+            luma = (r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16
+            if luma > threshold:
+                out[y, x, 0] = background[y, x, 0]
+                out[y, x, 1] = background[y, x, 1]
+                out[y, x, 2] = background[y, x, 2]
+
+
+# A solid RGB color, a background template image, or None for "keep as is".
+Background = Union[np.ndarray, Image.Image, None]
+
+
 class Converter:
     def __init__(self) -> None:
         self.libreoffice_cmd = settings.libreoffice_path
+        # One persistent LibreOffice profile per concurrent conversion. Reusing
+        # a profile skips first-run initialisation, and never sharing one keeps
+        # parallel soffice processes from locking each other out.
+        self._lo_profiles: Queue[Path] = Queue()
+        for index in range(settings.max_worker_threads):
+            self._lo_profiles.put((settings.data_dir / "libreoffice" / f"profile-{index}").resolve())
+        self.cleanup_hours = settings.cleanup_hours
+        self.png_compress_level = settings.png_compress_level
+        # Split the cores between the documents the task queue runs in
+        # parallel so page threads don't oversubscribe the machine.
+        self.page_workers = max(1, (os.cpu_count() or 1) // settings.max_worker_threads)
+        self.background_threshold = settings.background_color_threshold
 
     def process(self, task: Task) -> None:
         owner_segment = str(task.owner_id) if task.owner_id is not None else None
@@ -34,18 +81,24 @@ class Converter:
 
         try:
             pdf_path = self._convert_to_pdf(source_copy, workspace)
-            images = self._pdf_to_images(pdf_path, dpi=task.dpi)
-            processed = self._apply_background(images, task)
-            zip_path = self._write_results(processed, images, workspace, task.task_id)
+            background = self._load_background(task)
+            pages = self._pdf_to_images(pdf_path, dpi=task.dpi)
+            try:
+                zip_path, page_count = self._write_results(pages, background, workspace, task.task_id)
+            finally:
+                # Release the PDF document right away if writing stopped early.
+                pages.close()
+                if isinstance(background, Image.Image):
+                    background.close()
             original_snapshot = workspace / "page-001-original.png"
             if original_snapshot.exists():
                 task.original_snapshot = original_snapshot
-            task.expires_at = datetime.now(timezone.utc) + timedelta(hours=settings.cleanup_hours)
+            task.expires_at = datetime.now(timezone.utc) + timedelta(hours=self.cleanup_hours)
             expires_file = workspace / "expires_at"
             expires_file.write_text(str(task.expires_at.timestamp()))
             metadata = {
                 "source": task.source_name,
-                "pages": len(processed),
+                "pages": page_count,
                 "dpi": task.dpi,
                 "background": task.background_type.value,
                 "generated_at": datetime.now(timezone.utc).isoformat(),
@@ -75,8 +128,10 @@ class Converter:
         output_dir = workspace / "pdf"
         output_dir.mkdir(exist_ok=True)
 
+        profile = self._lo_profiles.get()
         cmd = [
             self.libreoffice_cmd,
+            f"-env:UserInstallation={profile.as_uri()}",
             "--headless",
             "--nologo",
             "--convert-to",
@@ -92,88 +147,146 @@ class Converter:
             raise ConversionError("LibreOffice not found. Set LIBREOFFICE_PATH.") from exc
         except subprocess.CalledProcessError as exc:
             raise ConversionError(f"LibreOffice failed: {exc.stderr.decode('utf-8', 'ignore')}") from exc
+        finally:
+            self._lo_profiles.put(profile)
 
         pdf_files = list(output_dir.glob("*.pdf"))
         if not pdf_files:
             raise ConversionError("PDF conversion produced no output")
         return pdf_files[0]
 
-    def _pdf_to_images(self, pdf_path: Path, dpi: int) -> List[Image.Image]:
+    def _pdf_to_images(self, pdf_path: Path, dpi: int) -> Iterator[Image.Image]:
+        # Pages are rendered lazily so only one full-resolution bitmap is
+        # resident at a time, whatever the document length.
+        with _PDFIUM_LOCK:
+            try:
+                pdf = pdfium.PdfDocument(str(pdf_path))
+                page_count = len(pdf)
+            except Exception as exc:  # pylint: disable=broad-except
+                raise ConversionError(f"PDF to image conversion failed: {exc}") from exc
         try:
-            poppler_path = settings.poppler_path
-            images = convert_from_path(
-                str(pdf_path),
-                dpi=dpi,
-                poppler_path=str(poppler_path) if poppler_path else None,
-                transparent=True,
-            )
-        except Exception as exc:  # pylint: disable=broad-except
-            raise ConversionError(f"PDF to image conversion failed: {exc}") from exc
-        return images
-
-    def _apply_background(self, images: List[Image.Image], task: Task) -> List[Image.Image]:
+            for index in range(page_count):
+                # The lock is released before yielding so other documents can
+                # render while this page is being composited and encoded.
+                with _PDFIUM_LOCK:
+                    try:
+                        page = pdf[index]
+                        try:
+                            bitmap = page.render(scale=dpi / 72, rev_byteorder=True)
+                            try:
+                                # Opaque renders are RGB, which PIL copies out of
+                                # the bitmap, so the bitmap can be freed here.
+                                image = bitmap.to_pil()
+                            finally:
+                                bitmap.close()
+                        finally:
+                            page.close()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        raise ConversionError(f"PDF to image conversion failed: {exc}") from exc
+                yield image
+        finally:
+            with _PDFIUM_LOCK:
+                pdf.close()
+
+    def _load_background(self, task: Task) -> Background:
         if task.background_type == BackgroundType.none:
-            return images
-        processed: List[Image.Image] = []
+            return None
         if task.background_type == BackgroundType.color:
             if not task.background_color:
                 raise ConversionError("Background color required for color background")
-            color = ImageColor.getrgb(task.background_color)
-            threshold = settings.background_color_threshold
-            for img in images:
-                rgba = img.convert("RGBA")
-                # Build a mask that keeps darker content (text/images) and replaces
-                # near-white pixels with the requested background color.
-                gray = rgba.convert("L")
-                mask = gray.point(lambda value: 0 if value > threshold else 255)
-                base = Image.new("RGB", rgba.size, color)
-                composite = Image.composite(rgba.convert("RGB"), base, mask)
-                processed.append(composite)
-            return processed
+            return np.array(ImageColor.getrgb(task.background_color)[:3], dtype=np.uint8)
         if task.background_type == BackgroundType.image:
             if not task.background_image_path:
                 raise ConversionError("Background image missing")
-            background_template = Image.open(task.background_image_path).convert("RGB")
-            threshold = settings.background_color_threshold
-            try:
-                for img in images:
-                    fg = img.convert("RGB")
-                    gray = fg.convert("L")
-                    mask = gray.point(lambda value: 0 if value > threshold else 255)
-                    bg_resized = background_template.resize(fg.size, Image.LANCZOS)
-                    composite = Image.composite(fg, bg_resized, mask)
-                    processed.append(composite)
-            finally:
-                background_template.close()
-            return processed
+            return Image.open(task.background_image_path).convert("RGB")
         raise ConversionError("Unsupported background type")
 
+    def _page_background(
+        self,
+        img: Image.Image,
+        background: Background,
+        bg_cache: Dict[Tuple[int, int], np.ndarray],
+    ) -> Optional[np.ndarray]:
+        if not isinstance(background, Image.Image):
+            return background
+        # Pages of one document almost always share a size, so the LANCZOS
+        # resize runs once per document rather than per page. Called from the
+        # submitting thread only, so the first wave of pages shares one resize.
+        resized = bg_cache.get(img.size)
+        if resized is None:
+            resized = np.asarray(background.resize(img.size, Image.LANCZOS))
+            bg_cache[img.size] = resized
+        return resized
+
+    def _apply_background(self, img: Image.Image, background: Optional[np.ndarray]) -> Image.Image:
+        if background is None:
+            return img
+        rgb = img if img.mode == "RGB" else img.convert("RGB")
+        # A writable copy of the page; the background is composited into it
+        # in place.
+        out = np.array(rgb)
+        # Keep darker content (text/images) and replace near-white pixels
+        # with the requested background.
+        _composite(out, np.broadcast_to(background, out.shape), self.background_threshold)
+        return Image.fromarray(out)
+
+    def _encode_page(self, img: Image.Image, background: Optional[np.ndarray]) -> bytes:
+        processed = self._apply_background(img, background)
+        buffer = io.BytesIO()
+        processed.save(buffer, format="PNG", compress_level=self.png_compress_level, optimize=False)
+        processed.close()
+        img.close()
+        return buffer.getvalue()
+
     def _write_results(
         self,
-        processed_images: List[Image.Image],
-        original_images: List[Image.Image],
+        pages: Iterable[Image.Image],
+        background: Background,
         workspace: Path,
         task_id: str,
-    ) -> Path:
-        images_dir = workspace / "images"
-        images_dir.mkdir(exist_ok=True)
-        saved_files: List[Path] = []
-        for index, img in enumerate(processed_images, start=1):
-            target = images_dir / f"page-{index:03d}.png"
-            img.save(target, format="PNG")
-            saved_files.append(target)
-
-        if original_images:
-            first_page = original_images[0].convert("RGB")
-            original_path = workspace / "page-001-original.png"
-            first_page.save(original_path, format="PNG")
-            saved_files.append(original_path)
-
+    ) -> Tuple[Path, int]:
         zip_path = workspace / f"{task_id}.zip"
-        with ZipFile(zip_path, "w") as zipf:
-            for file_path in saved_files:
-                zipf.write(file_path, arcname=file_path.name)
-        return zip_path
+        original_path: Optional[Path] = None
+        page_count = 0
+        bg_cache: Dict[Tuple[int, int], np.ndarray] = {}
+        pending: Deque[Tuple[str, Future[bytes]]] = deque()
+        # Pages are encoded once in memory and written straight into the
+        # archive. PNG data is already deflated, so the archive stores it as is.
+        with ZipFile(zip_path, "w", compression=ZIP_STORED) as zipf, ThreadPoolExecutor(
+            max_workers=self.page_workers
+        ) as pool:
+
+            def store(name: str, data: bytes) -> None:
+                zipf.writestr(name, data)
+                # Without a background the first processed page is the
+                # original, so reuse its encoding instead of a second pass.
+                if background is None and original_path is not None and name == "page-001.png":
+                    original_path.write_bytes(data)
+
+            for index, img in enumerate(pages, start=1):
+                if index == 1:
+                    # The snapshot is served on its own by /tasks/{id}/original.
+                    original_path = workspace / "page-001-original.png"
+                    if background is not None:
+                        img.convert("RGB").save(original_path, format="PNG")
+
+                page_background = self._page_background(img, background, bg_cache)
+                future = pool.submit(self._encode_page, img, page_background)
+                pending.append((f"page-{index:03d}.png", future))
+                page_count = index
+                # Cap pages in flight at the pool size so memory stays bounded
+                # by the thread count, not the document length.
+                if len(pending) >= self.page_workers:
+                    name, done = pending.popleft()
+                    store(name, done.result())
+
+            while pending:
+                name, done = pending.popleft()
+                store(name, done.result())
+
+            if original_path is not None:
+                zipf.write(original_path, arcname=original_path.name)
+        return zip_path, page_count
 
 
 converter = Converter()
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import tempfile
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Optional
+from zipfile import ZIP_STORED, ZipFile
 
 from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from .auth import StrapiUser, get_current_user
+from .auth import StrapiUser, close_strapi_client, get_current_user, start_strapi_client
 from .config import settings
 from .converter import converter
 from .models import BackgroundType, Task, TaskResponse, TaskState
@@ -28,6 +31,24 @@ def get_task_queue():
     return init_task_queue(converter)
 
 
+def _build_batch_zip(destination: Path, tasks: list[Task]) -> None:
+    with ZipFile(destination, "w", compression=ZIP_STORED) as zipf:
+        for task in tasks:
+            if not task.result_dir or not task.result_dir.exists():
+                continue
+
+            # 使用文档标题作为文件夹名
+            folder_name = task.result_dir.name
+            task_zip = task.result_dir / f"{task.task_id}.zip"
+
+            if task_zip.exists():
+                with ZipFile(task_zip) as source_zip:
+                    for name in sorted(source_zip.namelist()):
+                        if name.endswith("-original.png"):
+                            continue
+                        zipf.writestr(f"{folder_name}/{name}", source_zip.read(name))
+
+
 frontend_dir = Path(__file__).resolve().parents[2] / "frontend"
 
 app = FastAPI(title="Doc to Image Service", version="0.1.0")
@@ -44,13 +65,15 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    init_task_queue(converter)
+    init_task_queue(converter).start()
+    await start_strapi_client()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
     queue = init_task_queue(converter)
-    queue.shutdown()
+    await queue.shutdown()
+    await close_strapi_client()
 
 
 @app.get("/healthz")
@@ -127,7 +150,7 @@ async def create_task(
             owner_id=user.id,
             owner_email=user.email,
         )
-        queue.add_task(task)
+        await queue.add_task(task)
         processed_tasks.append(queue.to_response(task))
 
     if not processed_tasks:
@@ -166,10 +189,14 @@ async def download_task(
         raise HTTPException(status_code=400, detail="Task not completed")
 
     zip_path = task.result_dir / f"{task.task_id}.zip"
-    if not zip_path.exists():
-        raise HTTPException(status_code=404, detail="Result not found")
+    try:
+        stat_result = zip_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Result not found") from None
 
-    return FileResponse(zip_path, media_type="application/zip", filename=zip_path.name)
+    return FileResponse(
+        zip_path, media_type="application/zip", filename=zip_path.name, stat_result=stat_result
+    )
 
 
 @app.get("/tasks/{task_id}/original")
@@ -185,9 +212,16 @@ async def download_original(
         raise HTTPException(status_code=403, detail="Not permitted")
     if task.state != TaskState.completed or not task.original_snapshot:
         raise HTTPException(status_code=400, detail="Original snapshot not available")
-    if not task.original_snapshot.exists():
-        raise HTTPException(status_code=404, detail="Original snapshot missing")
-    return FileResponse(task.original_snapshot, media_type="image/png", filename=task.original_snapshot.name)
+    try:
+        stat_result = task.original_snapshot.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Original snapshot missing") from None
+    return FileResponse(
+        task.original_snapshot,
+        media_type="image/png",
+        filename=task.original_snapshot.name,
+        stat_result=stat_result,
+    )
 
 
 @app.get("/batches/{batch_id}/download")
@@ -197,15 +231,8 @@ async def download_batch(
     user: StrapiUser = Depends(get_current_user),
 ) -> FileResponse:
     """下载批次中所有已完成任务的图片，打包成一个 ZIP"""
-    from zipfile import ZipFile
-    import tempfile
-
     # 查找该批次的所有任务
-    batch_tasks: list[Task] = []
-    with queue._lock:
-        for task in queue.tasks.values():
-            if task.batch_id == batch_id and task.owner_id == user.id:
-                batch_tasks.append(task)
+    batch_tasks = [task for task in queue.get_batch_tasks(batch_id) if task.owner_id == user.id]
 
     if not batch_tasks:
         raise HTTPException(status_code=404, detail="Batch not found")
@@ -223,24 +250,14 @@ async def download_batch(
     temp_zip.close()
 
     try:
-        with ZipFile(temp_zip.name, 'w') as zipf:
-            for task in batch_tasks:
-                if not task.result_dir or not task.result_dir.exists():
-                    continue
-
-                # 使用文档标题作为文件夹名
-                folder_name = task.result_dir.name
-                images_dir = task.result_dir / "images"
-
-                if images_dir.exists():
-                    for image_file in sorted(images_dir.glob("*.png")):
-                        arcname = f"{folder_name}/{image_file.name}"
-                        zipf.write(image_file, arcname=arcname)
+        # 打包可能耗时数秒，放到线程中执行，避免阻塞事件循环
+        await asyncio.to_thread(_build_batch_zip, Path(temp_zip.name), batch_tasks)
 
         return FileResponse(
             temp_zip.name,
             media_type="application/zip",
             filename=f"batch-{batch_id}.zip",
+            stat_result=Path(temp_zip.name).stat(),
             background=None  # 不在后台删除，让 OS 清理临时文件
         )
     except Exception as e:
@@ -1,20 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import re
 import shutil
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
 from fastapi import UploadFile
 
 from .config import settings
 
 
+_SLUG_STRIP = re.compile(r"[^\w\s-]")
+_SLUG_DASH = re.compile(r"[\s-]+")
+
+
+@functools.lru_cache(maxsize=1024)
 def _slugify(name: str) -> str:
-    slug = re.sub(r"[^\w\s-]", "", name).strip().lower()
-    slug = re.sub(r"[\s-]+", "-", slug)
+    slug = _SLUG_STRIP.sub("", name).strip().lower()
+    slug = _SLUG_DASH.sub("-", slug)
     return slug or "document"
 
 
@@ -22,15 +29,20 @@ def generate_task_id() -> str:
     return uuid.uuid4().hex
 
 
+def _copy_to_file(source: BinaryIO, destination: Path) -> None:
+    with destination.open("wb") as f:
+        shutil.copyfileobj(source, f, length=1024 * 1024)
+
+
 async def save_upload(upload: UploadFile, destination_dir: Path) -> Path:
     destination_dir.mkdir(parents=True, exist_ok=True)
     file_suffix = Path(upload.filename or "document").suffix
     safe_name = f"{uuid.uuid4().hex}{file_suffix}"
     destination = destination_dir / safe_name
 
-    with destination.open("wb") as f:
-        while chunk := await upload.read(1024 * 1024):
-            f.write(chunk)
+    # UploadFile.file is a SpooledTemporaryFile, so it can be copied
+    # synchronously off the event loop.
+    await asyncio.to_thread(_copy_to_file, upload.file, destination)
     await upload.close()
     return destination
 
@@ -42,9 +54,11 @@ def create_task_workspace(task_id: str, source_name: str, owner_segment: Optiona
     if owner_segment:
         parts.append(Path(_slugify(owner_segment)))
     workspace = Path(*parts) / slug
-    if workspace.exists():
+    try:
+        workspace.mkdir(parents=True)
+    except FileExistsError:
         workspace = Path(*parts) / f"{slug}-{task_id[:8]}"
-    workspace.mkdir(parents=True, exist_ok=True)
+        workspace.mkdir(parents=True, exist_ok=True)
     return workspace
 
 
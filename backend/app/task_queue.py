@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-import threading
-import time
+import asyncio
+from collections import defaultdict
 from datetime import datetime
-from queue import Queue
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from rich.console import Console
 
@@ -17,24 +16,40 @@ class TaskQueue:
         self.converter = converter
         self.console = Console()
         self.tasks: Dict[str, Task] = {}
-        self._queue: Queue[Task] = Queue()
-        self._lock = threading.Lock()
-        self._shutdown = threading.Event()
+        self.batches: Dict[str, List[str]] = defaultdict(list)
+        # tasks/batches are only touched from the event loop, so they need no
+        # lock; conversions themselves run in worker threads via to_thread.
+        # The queue is created in start() so it is bound to the running loop.
+        self._queue: Optional[asyncio.Queue[Task]] = None
+        self._workers: List[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        queue: asyncio.Queue[Task] = asyncio.Queue(maxsize=settings.max_pending_tasks)
+        self._queue = queue
         self._workers = [
-            threading.Thread(target=self._worker_loop, name=f"worker-{i}", daemon=True)
+            asyncio.create_task(self._worker_loop(queue), name=f"worker-{i}")
             for i in range(settings.max_worker_threads)
         ]
         for worker in self._workers:
-            worker.start()
+            worker.add_done_callback(self._on_worker_done)
 
-    def add_task(self, task: Task) -> None:
-        with self._lock:
-            self.tasks[task.task_id] = task
-        self._queue.put(task)
+    async def add_task(self, task: Task) -> None:
+        self.tasks[task.task_id] = task
+        if task.batch_id:
+            self.batches[task.batch_id].append(task.task_id)
+        if self._queue is None:
+            raise RuntimeError("Task queue is not running")
+        # Blocks the request when max_pending_tasks is reached.
+        await self._queue.put(task)
 
     def get_task(self, task_id: str) -> Optional[Task]:
-        with self._lock:
-            return self.tasks.get(task_id)
+        return self.tasks.get(task_id)
+
+    def get_batch_tasks(self, batch_id: str) -> List[Task]:
+        task_ids = self.batches.get(batch_id, [])
+        return [self.tasks[task_id] for task_id in task_ids if task_id in self.tasks]
 
     def to_response(self, task: Task) -> TaskResponse:
         return TaskResponse(
@@ -51,44 +66,45 @@ class TaskQueue:
             owner_email=task.owner_email,
         )
 
-    def shutdown(self) -> None:
-        self._shutdown.set()
-        for _ in self._workers:
-            self._queue.put(None)  # type: ignore[arg-type]
+    async def shutdown(self) -> None:
         for worker in self._workers:
-            worker.join(timeout=2)
-
-    def _worker_loop(self) -> None:
-        while not self._shutdown.is_set():
-            task: Optional[Task] = self._queue.get()
-            if task is None:
-                break
-
-            with self._lock:
-                current = self.tasks.get(task.task_id)
-                if current:
-                    current.state = TaskState.processing
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def _on_worker_done(self, worker: asyncio.Task[None]) -> None:
+        if worker.cancelled():
+            return
+        exc = worker.exception()
+        if exc is not None:
+            self.console.log(f"{worker.get_name()} stopped unexpectedly: {exc!r}")
+
+    async def _worker_loop(self, queue: asyncio.Queue[Task]) -> None:
+        while True:
+            task = await queue.get()
+
+            current = self.tasks.get(task.task_id)
+            if current:
+                current.state = TaskState.processing
 
             self.console.log(f"Processing task {task.task_id}")
             try:
-                self.converter.process(task)
-                with self._lock:
-                    current = self.tasks.get(task.task_id)
-                    if current:
-                        current.state = TaskState.completed
-                        current.result_dir = task.result_dir
-                        current.expires_at = task.expires_at
-                        current.original_snapshot = task.original_snapshot
+                await asyncio.to_thread(self.converter.process, task)
+                current = self.tasks.get(task.task_id)
+                if current:
+                    current.state = TaskState.completed
+                    current.result_dir = task.result_dir
+                    current.expires_at = task.expires_at
+                    current.original_snapshot = task.original_snapshot
             except Exception as exc:  # pylint: disable=broad-except
                 self.console.log(f"Task {task.task_id} failed: {exc}")
-                with self._lock:
-                    current = self.tasks.get(task.task_id)
-                    if current:
-                        current.state = TaskState.failed
-                        current.error = str(exc)
+                current = self.tasks.get(task.task_id)
+                if current:
+                    current.state = TaskState.failed
+                    current.error = str(exc)
             finally:
-                self._queue.task_done()
-                time.sleep(settings.worker_poll_interval)
+                queue.task_done()
 
 
 task_queue: Optional[TaskQueue] = None